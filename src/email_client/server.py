@@ -1,29 +1,39 @@
 from typing import Any
 import asyncio
-from datetime import datetime, timedelta
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from functools import lru_cache
 import email
+from email.parser import BytesHeaderParser
 import imaplib
 import smtplib
+import ssl
 import logging
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+import re
+import unicodedata
 from dotenv import load_dotenv
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
 
-# Configure logging
+# Load environment variables from .env file
+load_dotenv()
+
+# Configure logging (set LOG_LEVEL=DEBUG for protocol-level detail)
+# Unknown level names fall back to INFO instead of failing at import
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.getLevelNamesMapping().get(os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
     format='%(asctime)s - %(levelname)s - %(message)s',
     filename='email_client.log'
 )
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Email configuration
 EMAIL_CONFIG = {
     "username": os.getenv("EMAIL_USERNAME", "your.email@gmail.com"),
@@ -32,45 +42,306 @@ EMAIL_CONFIG = {
     "default_email": os.getenv("DEFAULT_EMAIL"),
     "imap_server": os.getenv("IMAP_SERVER", "imap.gmail.com"),
     "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
-    "smtp_port": int(os.getenv("SMTP_PORT", "587"))
+    # Implicit TLS (SMTPS) skips the cleartext EHLO/STARTTLS/EHLO exchange
+    "smtp_use_ssl": os.getenv("SMTP_USE_SSL", "0") == "1",
+    "smtp_port": int(os.getenv("SMTP_PORT", "465" if os.getenv("SMTP_USE_SSL", "0") == "1" else "587"))
 }
 
 # Constants
 SEARCH_TIMEOUT = 60  # seconds
 MAX_EMAILS = 100
+MAX_KEYWORD_LENGTH = 200
+# Only the headers shown in search results; PEEK leaves the \Seen flag untouched
+SUMMARY_FETCH = '(BODY.PEEK[HEADER.FIELDS (FROM DATE SUBJECT)])'
+CONTENT_FETCH = '(BODY.PEEK[])'
+IMAP_KEEPALIVE_INTERVAL = 25 * 60  # seconds, below the 30 minute IMAP idle timeout
+# Socket timeout for pooled IMAP connections; short enough that a silently dead
+# connection fails and is retried well within SEARCH_TIMEOUT
+IMAP_SOCKET_TIMEOUT = SEARCH_TIMEOUT // 3
+SMTP_IDLE_TIMEOUT = 100  # seconds an idle SMTP connection is reused for
+SMTP_MAX_CONNECTIONS = 5  # per account, used when fanning out large recipient lists
+# Recipients per connection before a send is split across connections (0 disables)
+SMTP_RECIPIENTS_PER_CONNECTION = int(os.getenv("SMTP_RECIPIENTS_PER_CONNECTION", "0"))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", "16"))  # threads for blocking IMAP/SMTP calls
+SMTP_DEBUG = int(os.getenv("SMTP_DEBUG", "0"))  # smtplib debug level, traces to stderr
 
 server = Server("email")
 
-def format_email_summary(msg_data: tuple) -> dict:
-    """Format an email message into a summary dict with basic information."""
-    email_body = email.message_from_bytes(msg_data[0][1])
+# Stateless, so one instance can be shared; stops parsing at the end of the headers
+_HDR = BytesHeaderParser()
+
+# Authenticated IMAP connections, capped at one per (imap_server, username).
+# imaplib is not safe for concurrent use, so every connection has its own lock.
+_imap_pool: dict[tuple[str, str], tuple[imaplib.IMAP4_SSL | None, asyncio.Lock]] = {}
+_imap_keepalive_task: asyncio.Task | None = None
+
+def _imap_key() -> tuple[str, str]:
+    return (EMAIL_CONFIG["imap_server"], EMAIL_CONFIG["username"])
+
+def _imap_connect() -> imaplib.IMAP4_SSL:
+    """Open and authenticate a new IMAP connection."""
+    mail = imaplib.IMAP4_SSL(EMAIL_CONFIG["imap_server"], timeout=IMAP_SOCKET_TIMEOUT)
+    mail.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+    return mail
+
+def _imap_drop(key: tuple[str, str]) -> None:
+    """Invalidate a pooled connection so the next caller reconnects."""
+    mail, lock = _imap_pool[key]
+    _imap_pool[key] = (None, lock)
+    if mail is not None:
+        try:
+            # Only close the socket: a timed out executor job may still be using it
+            mail.shutdown()
+        except Exception:
+            pass
+
+async def _imap_keepalive() -> None:
+    """Periodically NOOP pooled connections so the server does not drop them."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(IMAP_KEEPALIVE_INTERVAL)
+        for key, (_, lock) in list(_imap_pool.items()):
+            async with lock:
+                mail = _imap_pool[key][0]
+                if mail is None:
+                    continue
+                try:
+                    # Bound how long the lock is held if the connection is black-holed
+                    async with asyncio.timeout(IMAP_SOCKET_TIMEOUT):
+                        await loop.run_in_executor(None, mail.noop)
+                except Exception as e:
+                    logging.warning(f"Dropping IMAP connection to {key[0]}: {str(e)}")
+                    _imap_drop(key)
+
+async def _run_imap(func, *args):
+    """Run func(mail, *args) on an executor thread with the pooled IMAP connection.
+
+    The connection is created lazily and held exclusively while func runs.
+    A connection found dead (IMAP4.abort or a socket error, e.g. after the
+    server or a NAT dropped it) is rebuilt and func retried once; the tools
+    only issue read-only commands, so a retry is safe. Cancellation by a
+    timeout leaves the connection mid-command, so it is dropped. Any other
+    error (a failed SELECT, a missing message) keeps the connection.
+    """
+    global _imap_keepalive_task
+    key = _imap_key()
+    if key not in _imap_pool:
+        _imap_pool[key] = (None, asyncio.Lock())
+    lock = _imap_pool[key][1]
+    loop = asyncio.get_running_loop()
+    
+    async with lock:
+        for attempt in range(2):
+            mail = _imap_pool[key][0]
+            if mail is None:
+                connecting = asyncio.ensure_future(loop.run_in_executor(None, _imap_connect))
+                try:
+                    mail = await asyncio.shield(connecting)
+                except asyncio.CancelledError:
+                    # The worker keeps going; close whatever connection it ends up with
+                    connecting.add_done_callback(
+                        lambda f: f.cancelled() or f.exception() is not None or f.result().shutdown()
+                    )
+                    raise
+                _imap_pool[key] = (mail, lock)
+            if _imap_keepalive_task is None or _imap_keepalive_task.done():
+                _imap_keepalive_task = asyncio.create_task(_imap_keepalive())
+            
+            try:
+                return await loop.run_in_executor(None, func, mail, *args)
+            except (imaplib.IMAP4.abort, OSError) as e:
+                _imap_drop(key)
+                if attempt:
+                    raise
+                logging.warning(f"Reconnecting to {key[0]} after a dropped connection: {str(e)}")
+            except asyncio.CancelledError:
+                _imap_drop(key)
+                raise
+
+# Authenticated SMTP connections keyed by (smtp_server, smtp_port, username, slot),
+# with the time they were last used so stale ones are not reused. Slot 0 serves
+# ordinary sends; fanned-out sends use up to SMTP_MAX_CONNECTIONS slots.
+_smtp_pool: dict[tuple[str, int, str, int], tuple[smtplib.SMTP | None, float, asyncio.Lock]] = {}
+
+def _smtp_key(slot: int = 0) -> tuple[str, int, str, int]:
+    return (EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"], EMAIL_CONFIG["username"], slot)
+
+def _smtp_close(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except Exception:
+        smtp.close()
+
+def _smtp_connect() -> smtplib.SMTP:
+    """Open a new SMTP connection over TLS (SMTPS or STARTTLS) and log in."""
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    if debug:
+        logging.debug(f"Connecting to {EMAIL_CONFIG['smtp_server']}:{EMAIL_CONFIG['smtp_port']}")
+    # A socket timeout keeps a worker thread from blocking forever in recv once
+    # the asyncio timeout around the send has given up on it
+    if EMAIL_CONFIG["smtp_use_ssl"]:
+        smtp = smtplib.SMTP_SSL(
+            EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"],
+            timeout=SEARCH_TIMEOUT, context=ssl.create_default_context()
+        )
+    else:
+        smtp = smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"], timeout=SEARCH_TIMEOUT)
+    smtp.set_debuglevel(SMTP_DEBUG)
+    
+    if not EMAIL_CONFIG["smtp_use_ssl"]:
+        # Start TLS
+        if debug:
+            logging.debug("Starting TLS")
+        smtp.starttls()
+    
+    # Login
+    if debug:
+        logging.debug(f"Logging in as {EMAIL_CONFIG['username']}")
+    smtp.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
+    return smtp
+
+def _smtp_reuse_or_connect(smtp: smtplib.SMTP | None, last_used: float) -> smtplib.SMTP:
+    """Return smtp if it is recent and still answers NOOP, otherwise a fresh connection."""
+    if smtp is not None:
+        if time.monotonic() - last_used <= SMTP_IDLE_TIMEOUT:
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+        _smtp_close(smtp)
+    return _smtp_connect()
+
+@asynccontextmanager
+async def _get_smtp(slot: int = 0):
+    """Borrow a pooled SMTP connection for the configured account.
+
+    The connection is held exclusively for the block and dropped if anything
+    inside it fails (e.g. SMTPServerDisconnected).
+    """
+    key = _smtp_key(slot)
+    if key not in _smtp_pool:
+        _smtp_pool[key] = (None, 0.0, asyncio.Lock())
+    lock = _smtp_pool[key][2]
+    
+    async with lock:
+        smtp, last_used, _ = _smtp_pool[key]
+        _smtp_pool[key] = (None, 0.0, lock)
+        loop = asyncio.get_running_loop()
+        connecting = asyncio.ensure_future(loop.run_in_executor(None, _smtp_reuse_or_connect, smtp, last_used))
+        try:
+            smtp = await asyncio.shield(connecting)
+        except asyncio.CancelledError:
+            # The worker keeps going; close whatever connection it ends up with
+            connecting.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or f.result().close()
+            )
+            raise
+        
+        try:
+            yield smtp
+        except BaseException:
+            smtp.close()
+            raise
+        _smtp_pool[key] = (smtp, time.monotonic(), lock)
+
+def format_email_summary(part: tuple) -> dict:
+    """Format a (uid, headers) pair into a summary dict with basic information."""
+    email_body = _HDR.parsebytes(part[1])
     
     return {
-        "id": msg_data[0][0].split()[0].decode(),  # Get the email ID
+        "id": part[0].decode(),  # UID, stable across sessions
         "from": email_body.get("From", "Unknown"),
         "date": email_body.get("Date", "Unknown"),
         "subject": email_body.get("Subject", "No Subject"),
     }
 
+# IMAP dates always use English month abbreviations, independent of locale
+_MON = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def _imap_date(d: date) -> str:
+    """Format a date as an IMAP search date (e.g. 05-Oct-2026)."""
+    return f"{d.day:02d}-{_MON[d.month - 1]}-{d.year}"
+
+@lru_cache(maxsize=128)
+def _build_criteria(start: date, end: date) -> tuple[bytes, ...]:
+    """Build SEARCH keys for the inclusive date range as ready-to-send byte tokens."""
+    if start == end:
+        # If searching for a single day
+        return (b"ON", _imap_date(start).encode())
+    # BEFORE is exclusive, so search up to the day after end
+    return (b"SINCE", _imap_date(start).encode(), b"BEFORE", _imap_date(end + timedelta(days=1)).encode())
+
+def _folder_mailbox(folder: str) -> str:
+    """Map a tool-level folder name to the IMAP mailbox to open."""
+    if folder == "sent":
+        return '"[Gmail]/Sent Mail"'  # 对于 Gmail
+    return "INBOX"
+
+_UID_RE = re.compile(rb'UID (\d+)')
+_INTERNALDATE_RE = re.compile(rb'INTERNALDATE " ?(\d{1,2})-(%s)-(\d{4})' % "|".join(_MON).encode())
+
+def _uid_fetch_parts(data: list) -> list[tuple[bytes, bytes]]:
+    """Pair each literal in a UID FETCH response with its message UID.
+
+    Servers may report the UID before or after the literal, so both the
+    envelope and the trailing fragment are checked.
+    """
+    parts = []
+    for i, item in enumerate(data):
+        if not isinstance(item, tuple):
+            continue
+        match = _UID_RE.search(item[0])
+        if match is None and i + 1 < len(data) and isinstance(data[i + 1], bytes):
+            match = _UID_RE.search(data[i + 1])
+        if match:
+            parts.append((match.group(1), item[1]))
+    return parts
+
+def _seq_set(nums: list[bytes]) -> bytes:
+    """Compress ascending message numbers into an IMAP sequence set (e.g. b'1:4,7')."""
+    ranges = []
+    start = prev = int(nums[0])
+    for num in map(int, nums[1:]):
+        if num != prev + 1:
+            ranges.append(f"{start}:{prev}" if start != prev else str(start))
+            start = num
+        prev = num
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ','.join(ranges).encode()
+
 def format_email_content(msg_data: tuple) -> dict:
     """Format an email message into a dict with full content."""
     email_body = email.message_from_bytes(msg_data[0][1])
     
     # Extract body content
-    body = ""
     if email_body.is_multipart():
-        # Handle multipart messages
+        # Handle multipart messages: pick the first text/plain part, HTML is the
+        # fallback. Only references are kept here; nothing is decoded yet.
+        plain = html = None
         for part in email_body.walk():
-            if part.get_content_type() == "text/plain":
-                body = part.get_payload(decode=True).decode()
+            content_type = part.get_content_type()
+            if content_type == "text/plain":
+                plain = part
                 break
-            elif part.get_content_type() == "text/html":
-                # If no plain text found, use HTML content
-                if not body:
-                    body = part.get_payload(decode=True).decode()
+            elif content_type == "text/html" and html is None:
+                html = part
+        # Message defines __len__ as the header count, so a header-less part
+        # (implicitly text/plain) is falsy; compare against None explicitly
+        target = plain if plain is not None else html
     else:
         # Handle non-multipart messages
-        body = email_body.get_payload(decode=True).decode()
+        target = email_body
+    
+    # Decode only the chosen part, honoring its declared charset
+    body = ""
+    if target is not None:
+        payload = target.get_payload(decode=True) or b""
+        try:
+            body = payload.decode(target.get_content_charset() or "utf-8", errors="replace")
+        except LookupError:
+            # Unknown charset name in the message headers
+            body = payload.decode("utf-8", errors="replace")
     
     return {
         "from": email_body.get("From", "Unknown"),
@@ -80,40 +351,108 @@ def format_email_content(msg_data: tuple) -> dict:
         "content": body
     }
 
-async def search_emails_async(mail: imaplib.IMAP4_SSL, search_criteria: str) -> list[dict]:
-    """Asynchronously search emails with timeout."""
-    loop = asyncio.get_event_loop()
-    try:
-        _, messages = await loop.run_in_executor(None, lambda: mail.search(None, search_criteria))
-        if not messages[0]:
-            return []
-            
-        email_list = []
-        for num in messages[0].split()[:MAX_EMAILS]:  # Limit to MAX_EMAILS
-            _, msg_data = await loop.run_in_executor(None, lambda: mail.fetch(num, '(RFC822)'))
-            email_list.append(format_email_summary(msg_data))
-            
-        return email_list
-    except Exception as e:
-        raise Exception(f"Error searching emails: {str(e)}")
+def _clean_keyword(keyword: str) -> str:
+    """Strip control characters (CR/LF would end the IMAP command) and check the length."""
+    # Only Cc can break the command; Cf (ZWJ, ZWNJ, soft hyphen) is meaningful text
+    keyword = "".join(" " if unicodedata.category(ch) == "Cc" else ch for ch in keyword).strip()
+    if len(keyword) > MAX_KEYWORD_LENGTH:
+        raise ValueError(f"Keyword must be at most {MAX_KEYWORD_LENGTH} characters.")
+    return keyword
+
+def _imap_quote(s: str) -> str:
+    """Quote an ASCII string for use in an IMAP command."""
+    return '"' + s.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def _search_uids(
+    mail: imaplib.IMAP4_SSL, search_criteria: tuple[bytes, ...], keyword: str | None
+) -> list[bytes]:
+    """Run UID SEARCH, additionally matching keyword against the subject or body if given."""
+    if not keyword:
+        _, messages = mail.uid('SEARCH', None, *search_criteria)
+        return messages[0].split()
+    
+    if keyword.isascii():
+        # Top-level search keys are ANDed, so no parenthesized grouping is needed
+        quoted = _imap_quote(keyword).encode()
+        _, messages = mail.uid('SEARCH', None, b'OR', b'SUBJECT', quoted, b'BODY', quoted, *search_criteria)
+        return messages[0].split()
+    
+    # Non-ASCII keywords must be sent as a UTF-8 literal. imaplib only supports a
+    # single literal per command (always the last argument), so SUBJECT and BODY
+    # are searched separately and the results merged.
+    uids = set()
+    for key in ("SUBJECT", "BODY"):
+        mail.literal = keyword.encode()
+        _, messages = mail.uid('SEARCH', 'CHARSET', 'UTF-8', *search_criteria, key)
+        uids.update(messages[0].split())
+    return sorted(uids, key=int)
+
+def _search_sync(
+    mail: imaplib.IMAP4_SSL, mailbox: str, search_criteria: tuple[bytes, ...], keyword: str | None = None
+) -> list[dict]:
+    """Examine, search and fetch summaries in one go. Runs on an executor thread."""
+    mail.select(mailbox, readonly=True)  # EXAMINE
+    uids = _search_uids(mail, search_criteria, keyword)
+    if not uids:
+        return []
+    
+    # Fetch all hits in one round-trip using a UID set
+    uid_set = b','.join(uids[:MAX_EMAILS])  # Limit to MAX_EMAILS
+    _, data = mail.uid('FETCH', uid_set, SUMMARY_FETCH)
+    
+    return [format_email_summary(part) for part in _uid_fetch_parts(data)]
+
+def _count_daily_sync(mail: imaplib.IMAP4_SSL, mailbox: str, search_criteria: tuple[bytes, ...]) -> Counter:
+    """Examine, search and bucket hits by arrival day in one go. Runs on an executor thread."""
+    mail.select(mailbox, readonly=True)  # EXAMINE
+    _, messages = mail.uid('SEARCH', None, *search_criteria)
+    if not messages[0]:
+        return Counter()
+    
+    # One FETCH for the arrival date of every hit instead of one SEARCH per day
+    _, data = mail.uid('FETCH', _seq_set(messages[0].split()), '(INTERNALDATE)')
+    
+    # Bucket on the literal day of INTERNALDATE: SEARCH matches dates on the
+    # server "disregarding time and timezone", so converting to local time
+    # (as Internaldate2tuple does) would move messages across days
+    counts = Counter()
+    for line in data:
+        match = _INTERNALDATE_RE.search(line)
+        if match:
+            day, month, year = match.groups()
+            counts[date(int(year), _MON.index(month.decode()) + 1, int(day))] += 1
+    return counts
+
+def _fetch_content_sync(mail: imaplib.IMAP4_SSL, mailbox: str, email_id: str) -> list:
+    """Examine the mailbox and fetch one full message by UID. Runs on an executor thread."""
+    mail.select(mailbox, readonly=True)  # EXAMINE
+    _, msg_data = mail.uid('FETCH', email_id, CONTENT_FETCH)
+    if not msg_data or not isinstance(msg_data[0], tuple):
+        raise ValueError(f"No email found with ID {email_id}")
+    return msg_data
+
+async def search_emails_async(
+    mailbox: str, search_criteria: tuple[bytes, ...], keyword: str | None = None
+) -> list[dict]:
+    """Asynchronously search emails on the pooled connection."""
+    return await _run_imap(_search_sync, mailbox, search_criteria, keyword)
 
-async def get_email_content_async(mail: imaplib.IMAP4_SSL, email_id: str) -> dict:
+async def get_email_content_async(mailbox: str, email_id: str) -> dict:
     """Asynchronously get full content of a specific email."""
-    loop = asyncio.get_event_loop()
-    try:
-        _, msg_data = await loop.run_in_executor(None, lambda: mail.fetch(email_id, '(RFC822)'))
-        return format_email_content(msg_data)
-    except Exception as e:
-        raise Exception(f"Error fetching email content: {str(e)}")
+    msg_data = await _run_imap(_fetch_content_sync, mailbox, email_id)
+    return format_email_content(msg_data)
 
-async def count_emails_async(mail: imaplib.IMAP4_SSL, search_criteria: str) -> int:
-    """Asynchronously count emails matching the search criteria."""
-    loop = asyncio.get_event_loop()
-    try:
-        _, messages = await loop.run_in_executor(None, lambda: mail.search(None, search_criteria))
-        return len(messages[0].split()) if messages[0] else 0
-    except Exception as e:
-        raise Exception(f"Error counting emails: {str(e)}")
+async def count_daily_emails_async(mailbox: str, search_criteria: tuple[bytes, ...]) -> Counter:
+    """Asynchronously count emails matching the search criteria, bucketed by day."""
+    return await _run_imap(_count_daily_sync, mailbox, search_criteria)
+
+class PartialSendError(Exception):
+    """Raised when an email reached some recipients but not others."""
+
+    def __init__(self, delivered: list[str], failed: dict):
+        super().__init__(f"Delivered to: {delivered}. Not delivered to: {failed}")
+        self.delivered = delivered
+        self.failed = failed
 
 async def send_email_async(
     to_addresses: list[str],
@@ -140,141 +479,169 @@ async def send_email_async(
         # Add body
         msg.attach(MIMEText(content, 'plain', 'utf-8'))
         
-        # Connect to SMTP server and send email
-        def send_sync():
-            with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
-                server.set_debuglevel(1)  # Enable debug output
-                logging.debug(f"Connecting to {EMAIL_CONFIG['smtp_server']}:{EMAIL_CONFIG['smtp_port']}")
-                
-                # Start TLS
-                logging.debug("Starting TLS")
-                server.starttls()
-                
-                # Login
-                logging.debug(f"Logging in as {EMAIL_CONFIG['username']}")
-                server.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
-                
-                # Send email
-                all_recipients = to_addresses + (cc_addresses or [])
-                logging.debug(f"Sending email from {from_name} <{from_email}> to: {all_recipients}")
-                result = server.send_message(msg, from_email, all_recipients)
-                
-                if result:
-                    # send_message returns a dict of failed recipients
-                    raise Exception(f"Failed to send to some recipients: {result}")
-                
+        all_recipients = to_addresses + (cc_addresses or [])
+        
+        def send_sync(smtp: smtplib.SMTP, recipients: list[str]) -> dict:
+            debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+            if debug:
+                logging.debug(f"Sending email from {from_name} <{from_email}> to: {recipients}")
+            # send_message returns a dict of failed recipients
+            result = smtp.send_message(msg, from_email, recipients)
+            if debug and not result:
                 logging.debug("Email sent successfully")
+            return result
+        
+        async def send_chunk(slot: int, recipients: list[str]) -> dict:
+            # Run the synchronous send function in the executor on a pooled connection
+            async with _get_smtp(slot) as smtp:
+                return await loop.run_in_executor(None, send_sync, smtp, recipients)
         
-        # Run the synchronous send function in the executor
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, send_sync)
+        chunk_size = SMTP_RECIPIENTS_PER_CONNECTION
+        if not chunk_size or len(all_recipients) <= chunk_size:
+            result = await send_chunk(0, all_recipients)
+            if result:
+                # send_message only returns (rather than raises) if someone accepted it
+                delivered = [recipient for recipient in all_recipients if recipient not in result]
+                raise PartialSendError(delivered, result)
+            return
+        
+        # Split the envelope recipients across several connections and send the
+        # same message to each chunk concurrently. Headers are unchanged, so
+        # every recipient still sees the full To/Cc lists.
+        chunks = [all_recipients[i:i + chunk_size] for i in range(0, len(all_recipients), chunk_size)]
+        msg.as_bytes()  # fix the multipart boundary before concurrent sends flatten msg
+        results = await asyncio.gather(
+            *(send_chunk(i % SMTP_MAX_CONNECTIONS, chunk) for i, chunk in enumerate(chunks)),
+            return_exceptions=True,
+        )
+        
+        delivered, failed = [], {}
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                failed.update({recipient: str(result) for recipient in chunk})
+            else:
+                failed.update(result)
+                delivered.extend(recipient for recipient in chunk if recipient not in result)
+        if failed:
+            if not delivered:
+                raise Exception(f"Failed to send to all recipients: {failed}")
+            raise PartialSendError(delivered, failed)
         
     except Exception as e:
         logging.error(f"Error in send_email_async: {str(e)}")
         raise
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    """
-    List available tools.
-    Each tool specifies its arguments using JSON Schema validation.
-    """
-    return [
-        types.Tool(
-            name="search-emails",
-            description="Search emails within a date range and/or with specific keywords",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "start_date": {
-                        "type": "string",
-                        "description": "Start date in YYYY-MM-DD format (optional)",
-                    },
-                    "end_date": {
-                        "type": "string",
-                        "description": "End date in YYYY-MM-DD format (optional)",
-                    },
-                    "keyword": {
-                        "type": "string",
-                        "description": "Keyword to search in email subject and body (optional)",
-                    },
-                    "folder": {
-                        "type": "string",
-                        "description": "Folder to search in ('inbox' or 'sent', defaults to 'inbox')",
-                        "enum": ["inbox", "sent"],
-                    },
+# Tool definitions are static, so they are built once and shared across list requests
+_TOOLS = [
+    types.Tool(
+        name="search-emails",
+        description="Search emails within a date range and/or with specific keywords",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format (optional)",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format (optional)",
+                },
+                "keyword": {
+                    "type": "string",
+                    "description": "Keyword to search in email subject and body (optional)",
+                },
+                "folder": {
+                    "type": "string",
+                    "description": "Folder to search in ('inbox' or 'sent', defaults to 'inbox')",
+                    "enum": ["inbox", "sent"],
                 },
             },
-        ),
-        types.Tool(
-            name="get-email-content",
-            description="Get the full content of a specific email by its ID",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "email_id": {
-                        "type": "string",
-                        "description": "The ID of the email to retrieve",
-                    },
+        },
+    ),
+    types.Tool(
+        name="get-email-content",
+        description="Get the full content of a specific email by its ID",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "email_id": {
+                    "type": "string",
+                    "description": "The ID of the email to retrieve",
+                },
+                "folder": {
+                    "type": "string",
+                    "description": "Folder the email is in ('inbox' or 'sent', defaults to 'inbox')",
+                    "enum": ["inbox", "sent"],
                 },
-                "required": ["email_id"],
             },
-        ),
-        types.Tool(
-            name="count-daily-emails",
-            description="Count emails received for each day in a date range",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "start_date": {
-                        "type": "string",
-                        "description": "Start date in YYYY-MM-DD format",
-                    },
-                    "end_date": {
-                        "type": "string",
-                        "description": "End date in YYYY-MM-DD format",
-                    },
+            "required": ["email_id"],
+        },
+    ),
+    types.Tool(
+        name="count-daily-emails",
+        description="Count emails received for each day in a date range",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format",
                 },
-                "required": ["start_date", "end_date"],
             },
-        ),
-        types.Tool(
-            name="send-email",
-            description="CONFIRMATION STEP: Actually send the email after user confirms the details. Before calling this, first show the email details to the user for confirmation. Required fields: recipients (to), subject, and content. Optional: CC recipients, sender_email, and sender_name.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "to": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of recipient email addresses (confirmed)",
-                    },
-                    "subject": {
-                        "type": "string",
-                        "description": "Confirmed email subject",
-                    },
-                    "content": {
-                        "type": "string",
-                        "description": "Confirmed email content",
-                    },
-                    "cc": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "List of CC recipient email addresses (optional, confirmed)",
-                    },
-                    "sender_email": {
-                        "type": "string",
-                        "description": "Email address to send from (optional, uses default if not specified)",
-                    },
-                    "sender_name": {
-                        "type": "string",
-                        "description": "Display name for the sender (optional, uses default if not specified)",
-                    },
+            "required": ["start_date", "end_date"],
+        },
+    ),
+    types.Tool(
+        name="send-email",
+        description="CONFIRMATION STEP: Actually send the email after user confirms the details. Before calling this, first show the email details to the user for confirmation. Required fields: recipients (to), subject, and content. Optional: CC recipients, sender_email, and sender_name.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "to": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of recipient email addresses (confirmed)",
+                },
+                "subject": {
+                    "type": "string",
+                    "description": "Confirmed email subject",
+                },
+                "content": {
+                    "type": "string",
+                    "description": "Confirmed email content",
+                },
+                "cc": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of CC recipient email addresses (optional, confirmed)",
+                },
+                "sender_email": {
+                    "type": "string",
+                    "description": "Email address to send from (optional, uses default if not specified)",
+                },
+                "sender_name": {
+                    "type": "string",
+                    "description": "Display name for the sender (optional, uses default if not specified)",
                 },
-                "required": ["to", "subject", "content"],
             },
-        ),
-    ]
+            "required": ["to", "subject", "content"],
+        },
+    ),
+]
+
+@server.list_tools()
+async def handle_list_tools() -> list[types.Tool]:
+    """
+    List available tools.
+    Each tool specifies its arguments using JSON Schema validation.
+    """
+    return _TOOLS
 
 @server.call_tool()
 async def handle_call_tool(
@@ -326,6 +693,12 @@ async def handle_call_tool(
                     type="text",
                     text="Operation timed out while sending email."
                 )]
+            except PartialSendError as e:
+                logging.error(f"Email only partly sent: {str(e)}")
+                return [types.TextContent(
+                    type="text",
+                    text=f"Email was only partly sent from {actual_sender_name} <{actual_sender_email}>.\n\nDelivered to: {', '.join(e.delivered)}\nNot delivered to: {', '.join(e.failed)}\n\nDetails: {e.failed}\n\nIf retrying, send only to the recipients that were not delivered to, so nobody receives a duplicate."
+                )]
             except Exception as e:
                 error_msg = str(e)
                 logging.error(f"Failed to send email: {error_msg}")
@@ -334,17 +707,9 @@ async def handle_call_tool(
                     text=f"Failed to send email: {error_msg}\n\nPlease check:\n1. Email and password are correct in .env\n2. SMTP settings are correct\n3. Less secure app access is enabled (for Gmail)\n4. Using App Password if 2FA is enabled"
                 )]
         
-        # Connect to IMAP server using predefined credentials
-        mail = imaplib.IMAP4_SSL(EMAIL_CONFIG["imap_server"])
-        mail.login(EMAIL_CONFIG["username"], EMAIL_CONFIG["password"])
-        
         if name == "search-emails":
             # 选择文件夹
-            folder = arguments.get("folder", "inbox")  # 默认选择收件箱
-            if folder == "sent":
-                mail.select('"[Gmail]/Sent Mail"')  # 对于 Gmail
-            else:
-                mail.select("inbox")
+            mailbox = _folder_mailbox(arguments.get("folder", "inbox"))  # 默认选择收件箱
             
             # Get optional parameters
             start_date = arguments.get("start_date")
@@ -352,38 +717,22 @@ async def handle_call_tool(
             keyword = arguments.get("keyword")
             
             # If no dates provided, default to last 7 days
-            if not start_date:
-                start_date = datetime.now() - timedelta(days=7)
-                start_date = start_date.strftime("%d-%b-%Y")
-            else:
-                start_date = datetime.strptime(start_date, "%Y-%m-%d").strftime("%d-%b-%Y")
-                
-            if not end_date:
-                end_date = datetime.now().strftime("%d-%b-%Y")
-            else:
-                # Convert end_date to datetime object once
-                end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-                end_date = end_date_obj.strftime("%d-%b-%Y")
+            today = date.today()
+            start = date.fromisoformat(start_date) if start_date else today - timedelta(days=7)
+            end = date.fromisoformat(end_date) if end_date else today
             
             # Build search criteria
-            if start_date == end_date:
-                # If searching for a single day
-                search_criteria = f'ON "{start_date}"'
-            else:
-                # Calculate next day using the already converted end_date_obj
-                next_day = (end_date_obj + timedelta(days=1)).strftime("%d-%b-%Y")
-                search_criteria = f'SINCE "{start_date}" BEFORE "{next_day}"'
-                
+            search_criteria = _build_criteria(start, end)
+            
             if keyword:
-                # Fix: Properly combine keyword search with date criteria
-                keyword_criteria = f'(OR SUBJECT "{keyword}" BODY "{keyword}")'
-                search_criteria = f'({keyword_criteria} {search_criteria})'
+                # The keyword is quoted (or sent as a literal) when the search runs
+                keyword = _clean_keyword(keyword)
             
-            logging.debug(f"Search criteria: {search_criteria}")  # Add debug logging
+            logging.debug(f"Search criteria: {search_criteria}, keyword: {keyword!r}")  # Add debug logging
             
             try:
                 async with asyncio.timeout(SEARCH_TIMEOUT):
-                    email_list = await search_emails_async(mail, search_criteria)
+                    email_list = await search_emails_async(mailbox, search_criteria, keyword)
                     
                 if not email_list:
                     return [types.TextContent(
@@ -392,14 +741,13 @@ async def handle_call_tool(
                     )]
                 
                 # Format the results as a table
-                result_text = "Found emails:\n\n"
-                result_text += "ID | From | Date | Subject\n"
-                result_text += "-" * 80 + "\n"
-                
-                for email in email_list:
-                    result_text += f"{email['id']} | {email['from']} | {email['date']} | {email['subject']}\n"
-                
-                result_text += "\nUse get-email-content with an email ID to view the full content of a specific email."
+                lines = ["Found emails:", "", "ID | From | Date | Subject", "-" * 80]
+                lines.extend(
+                    f"{email['id']} | {email['from']} | {email['date']} | {email['subject']}"
+                    for email in email_list
+                )
+                lines += ["", "Use get-email-content with an email ID to view the full content of a specific email."]
+                result_text = "\n".join(lines)
                 
                 return [types.TextContent(
                     type="text",
@@ -419,10 +767,16 @@ async def handle_call_tool(
                     type="text",
                     text="Email ID is required."
                 )]
+            if not (email_id.isascii() and email_id.isdigit()):
+                return [types.TextContent(
+                    type="text",
+                    text="Email ID must be a numeric ID as returned by search-emails."
+                )]
+            mailbox = _folder_mailbox(arguments.get("folder", "inbox"))
             
             try:
                 async with asyncio.timeout(SEARCH_TIMEOUT):
-                    email_content = await get_email_content_async(mail, email_id)
+                    email_content = await get_email_content_async(mailbox, email_id)
                     
                 result_text = (
                     f"From: {email_content['from']}\n"
@@ -444,26 +798,27 @@ async def handle_call_tool(
                 )]
                 
         elif name == "count-daily-emails":
-            start_date = datetime.strptime(arguments["start_date"], "%Y-%m-%d")
-            end_date = datetime.strptime(arguments["end_date"], "%Y-%m-%d")
+            start_date = date.fromisoformat(arguments["start_date"])
+            end_date = date.fromisoformat(arguments["end_date"])
+            if end_date < start_date:
+                raise ValueError("end_date must not be before start_date.")
             
-            result_text = "Daily email counts:\n\n"
-            result_text += "Date | Count\n"
-            result_text += "-" * 30 + "\n"
+            # Single search over the whole range, bucketed client-side
+            search_criteria = _build_criteria(start_date, end_date)
             
-            current_date = start_date
-            while current_date <= end_date:
-                date_str = current_date.strftime("%d-%b-%Y")
-                search_criteria = f'(ON "{date_str}")'
-                
-                try:
-                    async with asyncio.timeout(SEARCH_TIMEOUT):
-                        count = await count_emails_async(mail, search_criteria)
-                        result_text += f"{current_date.strftime('%Y-%m-%d')} | {count}\n"
-                except asyncio.TimeoutError:
-                    result_text += f"{current_date.strftime('%Y-%m-%d')} | Timeout\n"
-                
-                current_date += timedelta(days=1)
+            try:
+                async with asyncio.timeout(SEARCH_TIMEOUT):
+                    counts = await count_daily_emails_async("INBOX", search_criteria)
+            except asyncio.TimeoutError:
+                return [types.TextContent(
+                    type="text",
+                    text="Operation timed out while counting emails."
+                )]
+            
+            days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+            lines = ["Daily email counts:", "", "Date | Count", "-" * 30]
+            lines.extend(f"{day.isoformat()} | {counts[day]}" for day in days)
+            result_text = "\n".join(lines) + "\n"
             
             return [types.TextContent(
                 type="text",
@@ -478,14 +833,13 @@ async def handle_call_tool(
             type="text",
             text=f"Error: {str(e)}"
         )]
-    finally:
-        try:
-            mail.close()
-            mail.logout()
-        except:
-            pass
 
 async def main():
+    # Bound the number of blocking IMAP/SMTP operations that can run at once
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=EMAIL_WORKERS, thread_name_prefix="email-io")
+    )
+    
     # Run the server using stdin/stdout streams
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
         await server.run(